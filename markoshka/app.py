@@ -0,0 +1,653 @@
+"""Markoshka display loop: phrase modes, buttons and weather screen."""
+
+from __future__ import annotations
+
+import importlib.util
+import json
+import os
+import random
+import signal
+import threading
+import time
+from datetime import datetime, timezone
+from enum import Enum
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from markoshka.display import (
+    ConsoleDisplayDriver,
+    DisplayDriver,
+    PD2800DisplayDriver,
+    PD2800SerialDisplayDriver,
+    show_encoded_frames,
+    show_frames,
+    show_message,
+    show_static_message,
+)
+from markoshka.phrases import (
+    Category,
+    PHRASE_CATALOGUE,
+    PRECOMPUTED_ENCODED,
+    PRECOMPUTED_FRAMES,
+)
+from config import PORT, BAUD
+
+if TYPE_CHECKING:  # pragma: no cover - typing only
+    import requests
+
+# Checked once at import instead of once per ButtonManager.
+_HAS_GPIOZERO = importlib.util.find_spec("gpiozero") is not None
+
+MODE_DISPLAY_NAMES = {
+    "sequential": "Режим: подряд",
+    "random": "Режим: рандом",
+    "category": "Режим: по разделу",
+    "weather": "Режим: погода",
+}
+
+WEEKDAYS = ("Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс")
+
+
+class Mode(str, Enum):
+    SEQUENTIAL = "sequential"
+    RANDOM = "random"
+    CATEGORY_SEQUENCE = "category"
+    WEATHER = "weather"
+
+
+# Short press cycles the phrase modes; from weather it returns to the start.
+NEXT_MODE: Dict[Mode, Mode] = {
+    Mode.SEQUENTIAL: Mode.RANDOM,
+    Mode.RANDOM: Mode.CATEGORY_SEQUENCE,
+    Mode.CATEGORY_SEQUENCE: Mode.SEQUENTIAL,
+    Mode.WEATHER: Mode.SEQUENTIAL,
+}
+
+
+class PhraseSequencer:
+    """Keeps track of phrase order across different modes.
+
+    Phrases of all categories are flattened into parallel lists once, so
+    each mode is a single index into ``_all_phrases``/``_all_cats``.
+    """
+
+    def __init__(self, categories: Dict[str, Category]):
+        self.categories: List[Category] = list(categories.values())
+        self._all_phrases: List[str] = [p for c in self.categories for p in c.phrases]
+        self._all_cats: List[Category] = [c for c in self.categories for _ in c.phrases]
+        # Index into self.categories for every flattened phrase.
+        self._cat_index_of: List[int] = [
+            idx for idx, c in enumerate(self.categories) for _ in c.phrases
+        ]
+        # Flat offset of the first phrase of each category.
+        self._category_starts: List[int] = []
+        offset = 0
+        for category in self.categories:
+            self._category_starts.append(offset)
+            offset += len(category.phrases)
+        self.position: int = 0
+
+    # Manual category selection for CATEGORY_SEQUENCE goes through these
+    # views of ``position``.
+    @property
+    def category_index(self) -> int:
+        return self._cat_index_of[self.position]
+
+    @category_index.setter
+    def category_index(self, value: int) -> None:
+        self.position = self._category_starts[value]
+
+    @property
+    def phrase_index(self) -> int:
+        return self.position - self._category_starts[self.category_index]
+
+    @phrase_index.setter
+    def phrase_index(self, value: int) -> None:
+        self.position = self._category_starts[self.category_index] + value
+
+    def next_phrase(self, mode: Mode) -> Tuple[Category, str]:
+        if mode == Mode.RANDOM:
+            # Uniform over all phrases, regardless of category size.
+            i = random.randrange(len(self._all_phrases))
+            return self._all_cats[i], self._all_phrases[i]
+
+        # SEQUENTIAL and CATEGORY_SEQUENCE: run phrases of the current
+        # category, then continue to the next categories sequentially.
+        i = self.position
+        self.position = (i + 1) % len(self._all_phrases)
+        return self._all_cats[i], self._all_phrases[i]
+
+
+class ButtonManager:
+    """Configure single-button controls using gpiozero when available."""
+
+    def __init__(
+        self,
+        short_press: Callable[[], None],
+        long_press: Callable[[], None],
+        hold_time: float = 1.2,
+        gpio_pin: int = 17,
+        bounce_time: float = 0.02,
+        min_release_interval: float = 0.05,
+    ) -> None:
+        self.short_press = short_press
+        self.long_press = long_press
+        self.button = None
+        # Releases closer together than this are contact bounce, not presses.
+        self.min_release_interval = min_release_interval
+        self._last_release: float = 0.0
+
+        if not _HAS_GPIOZERO:
+            print("gpiozero not installed; button disabled. Use Ctrl+C to exit.")
+            return
+
+        from gpiozero import Button  # type: ignore
+
+        self.button = Button(
+            gpio_pin, pull_up=True, hold_time=hold_time, bounce_time=bounce_time
+        )
+        self.button.when_released = self._handle_release
+
+    def _handle_release(self) -> None:
+        if self.button is None:
+            return
+        now = time.monotonic()
+        if now - self._last_release < self.min_release_interval:
+            return
+        self._last_release = now
+        if self.button.is_held:
+            self.long_press()
+        else:
+            self.short_press()
+
+    def close(self) -> None:
+        if self.button is not None:
+            self.button.close()
+            self.button = None
+
+
+UPDATE_PERIOD_SECONDS = 5.0
+
+# Weather is refreshed proactively in the background every TTL seconds, with
+# random jitter so restarts of several devices don't hit the API in lockstep.
+WEATHER_TTL_SECONDS = 30 * 60
+WEATHER_JITTER_SECONDS = 120.0
+WEATHER_RETRY_SECONDS = 60.0
+WEATHER_MIN_TTL_SECONDS = 60
+# Last good data is shown for at most a day before reporting "unavailable".
+WEATHER_MAX_AGE_SECONDS = 24 * 3600
+# The last good weather survives restarts, so a freshly started app neither
+# waits for nor repeats a fetch made by the previous process.
+WEATHER_CACHE_PATH = (
+    Path(os.getenv("XDG_CACHE_HOME", "~/.cache")).expanduser() / "markoshka" / "weather.json"
+)
+
+
+_WEATHER_SESSION: Optional["requests.Session"] = None
+
+
+def weather_session() -> "requests.Session":
+    """Return the keep-alive session shared by all weather calls.
+
+    Refreshes reuse the TCP/TLS connection instead of handshaking with the
+    API every time. ``requests`` is imported here, on first use from the
+    refresh timer, so it doesn't slow down startup.
+    """
+    global _WEATHER_SESSION
+    if _WEATHER_SESSION is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=2))
+        session.headers["User-Agent"] = "markoshka/1.0"
+        _WEATHER_SESSION = session
+    return _WEATHER_SESSION
+
+
+def max_age_from_cache_control(header: Optional[str]) -> Optional[int]:
+    """Return the ``max-age`` value of a Cache-Control header, if any."""
+    if not header:
+        return None
+    for directive in header.split(","):
+        name, _, value = directive.strip().partition("=")
+        if name.lower() != "max-age":
+            continue
+        try:
+            return int(value.strip().strip('"'))
+        except ValueError:
+            return None
+    return None
+
+
+class MarkoshkaApp:
+    def __init__(self, driver: Optional[DisplayDriver] = None) -> None:
+        self.driver = driver or self._default_driver()
+        self.mode = Mode.SEQUENTIAL
+        self.sequencer = PhraseSequencer(PHRASE_CATALOGUE)
+        self.running = True
+        self._stopped = False
+        self.pending_overlay: Optional[str] = None
+        # Set by button callbacks (and stop) to wake the main loop immediately.
+        self._wake = threading.Event()
+        self.last_category_shown: Optional[str] = None
+        self._prev_mode: Optional[Mode] = None
+        # Last good weather data, refreshed by a background timer so the
+        # display loop never waits on the network.
+        self._weather_cache: Optional[dict] = None
+        self._weather_lock = threading.Lock()
+        self._weather_timer: Optional[threading.Timer] = None
+        # max-age from the last weather response's Cache-Control header
+        self._weather_max_age: Optional[int] = None
+        self._weather_attempted: bool = False
+        # Track last minute shown in weather mode to avoid redrawing within same minute
+        self._last_weather_minute: Optional[int] = None
+        # (epoch minute, formatted clock line) for the weather screen
+        self._clock_cache: Tuple[int, str] = (-1, "")
+        # prevent immediate mode-button toggles after switching modes (debounce)
+        self._mode_ignore_until: float = 0.0
+        # When True, ignore mode-button toggles (used while displaying text)
+        self._display_busy: bool = False
+
+        # Primary button (GPIO17) — existing behavior
+        self.mode_button = ButtonManager(
+            short_press=self.toggle_mode,
+            long_press=self.cycle_category,
+            gpio_pin=int(os.getenv("MARKOSHKALCD_BUTTON_PIN", "17")),
+        )
+        # Second button (GPIO27) — toggle between phrases and weather
+        weather_pin = int(os.getenv("MARKOSHKALCD_WEATHER_PIN", "27"))
+        self.weather_button = ButtonManager(
+            short_press=self.toggle_weather,
+            long_press=lambda: None,
+            gpio_pin=weather_pin,
+        )
+        # Reuse weather saved by a previous run; otherwise start fetching right
+        # away so it is ready before the user asks.
+        self._load_weather_cache()
+        delay = 0.0
+        if self._weather_cache:
+            self._weather_attempted = True
+            remaining = self._weather_cache["fetched_at"] + WEATHER_TTL_SECONDS - time.time()
+            delay = min(max(0.0, remaining), WEATHER_TTL_SECONDS)
+        self._schedule_weather_refresh(delay)
+
+    def _default_driver(self) -> DisplayDriver:
+        transport = os.getenv("MARKOSHKALCD_TRANSPORT", "serial").lower()
+        if transport == "serial":
+            port = os.getenv("MARKOSHKALCD_PORT", PORT)
+            baud_env = os.getenv("MARKOSHKALCD_BAUD")
+            baudrate = int(baud_env) if baud_env else BAUD
+            try:
+                return PD2800SerialDisplayDriver(port=port, baudrate=baudrate)
+            except Exception as exc:
+                print(f"PD2800 serial driver unavailable, trying I2C: {exc}")
+                transport = "i2c"
+
+        if transport == "i2c":
+            address_env = os.getenv("MARKOSHKALCD_ADDR")
+            lcd_address = int(address_env, 0) if address_env else 0x27
+            try:
+                return PD2800DisplayDriver(address=lcd_address)
+            except Exception as exc:
+                print(f"PD2800 I2C driver unavailable, falling back to console: {exc}")
+
+        return ConsoleDisplayDriver()
+
+    def toggle_mode(self) -> None:
+        # ignore mode toggles if within ignore window (to avoid immediate flip-flop)
+        if time.time() < getattr(self, "_mode_ignore_until", 0):
+            return
+        # also ignore toggles while we're actively writing frames/messages
+        if getattr(self, "_display_busy", False):
+            return
+
+        self.mode = NEXT_MODE[self.mode]
+        self.pending_overlay = MODE_DISPLAY_NAMES[self.mode.value]
+        self._wake.set()
+
+    def cycle_category(self) -> None:
+        if self.mode != Mode.CATEGORY_SEQUENCE:
+            self.mode = Mode.CATEGORY_SEQUENCE
+        self.sequencer.category_index = (self.sequencer.category_index + 1) % len(
+            self.sequencer.categories
+        )
+        self.sequencer.phrase_index = 0
+        category_name = self.sequencer.categories[self.sequencer.category_index].name
+        self.pending_overlay = f"Раздел: {category_name}"
+        self._wake.set()
+
+    def toggle_weather(self) -> None:
+        """Toggle weather display mode on/off using second button."""
+        if self.mode == Mode.WEATHER:
+            # restore previous mode
+            self.mode = self._prev_mode or Mode.SEQUENTIAL
+            self._prev_mode = None
+            # show overlay for restored mode
+            self.pending_overlay = MODE_DISPLAY_NAMES.get(self.mode.value, "Режим: фразы")
+            # reset minute tracker so next entry will refresh immediately
+            self._last_weather_minute = None
+            # allow mode button immediately after leaving weather
+            self._mode_ignore_until = time.time() + 0.1
+        else:
+            # enter weather mode, remember previous
+            self._prev_mode = self.mode
+            self.mode = Mode.WEATHER
+            self.pending_overlay = "Режим: погода"
+            # ensure immediate display on entering mode
+            self._last_weather_minute = None
+            # ignore mode button briefly to avoid accidental bounce/back-toggle
+            self._mode_ignore_until = time.time() + 1.0
+        self._wake.set()
+
+    def fetch_weather(self) -> Optional[dict]:
+        """Fetch weather data. Try OpenWeatherMap if API key provided, otherwise Open-Meteo fallback.
+
+        This call blocks on the network; it only runs on the background
+        refresh timer (see :py:meth:`_schedule_weather_refresh`).
+
+        Environment variables:
+        - OPENWEATHER_API_KEY (optional) and WEATHER_CITY (optional)
+        - or WEATHER_LAT and WEATHER_LON for Open-Meteo
+        """
+        try:
+            session = weather_session()
+            api_key = os.getenv("OPENWEATHER_API_KEY")
+            if api_key:
+                city = os.getenv("WEATHER_CITY", "Moscow")
+                params = {"q": city, "appid": api_key, "units": "metric", "lang": "ru"}
+                resp = session.get("https://api.openweathermap.org/data/2.5/weather", params=params, timeout=5.0)
+                resp.raise_for_status()
+                self._weather_max_age = max_age_from_cache_control(resp.headers.get("Cache-Control"))
+                data = resp.json()
+                return {
+                    "temp": round(data["main"]["temp"]),
+                    "humidity": data["main"].get("humidity"),
+                    "wind": round(data.get("wind", {}).get("speed", 0), 1),
+                    "city": data.get("name"),
+                }
+
+            # Fallback to Open-Meteo (requires lat/lon)
+            # Use defaults (Rostov-on-Don) if env not provided
+            lat = "47.2357"
+            lon = "39.7015"
+            if lat and lon:
+                # current_weather has no humidity, so ask for hourly
+                # relativehumidity_2m in the same request.
+                params = {
+                    "latitude": lat,
+                    "longitude": lon,
+                    "current_weather": "true",
+                    "hourly": "relativehumidity_2m",
+                    "timezone": "UTC",
+                    "forecast_days": 1,
+                }
+                resp = session.get("https://api.open-meteo.com/v1/forecast", params=params, timeout=5.0)
+                resp.raise_for_status()
+                self._weather_max_age = max_age_from_cache_control(resp.headers.get("Cache-Control"))
+                data = resp.json()
+                current = data.get("current_weather", {})
+                hourly = data.get("hourly", {})
+                humidity_values = hourly.get("relativehumidity_2m", [])
+                # pick the hourly slot matching current_weather's hour
+                # ("YYYY-MM-DDTHH:MM"), falling back to the current UTC hour
+                current_hour = (current.get("time") or "")[:13]
+                hours = [t[:13] for t in hourly.get("time", [])]
+                if current_hour and current_hour in hours:
+                    hour_index = hours.index(current_hour)
+                else:
+                    hour_index = datetime.now(timezone.utc).hour
+                humidity = humidity_values[hour_index] if hour_index < len(humidity_values) else None
+
+                return {
+                    "temp": round(current.get("temperature")) if current.get("temperature") is not None else None,
+                    "humidity": humidity,
+                    "wind": round(current.get("windspeed", 0), 1),
+                    "city": None,
+                }
+
+            return None
+        except Exception:
+            return None
+
+    def _cached_weather(self) -> Optional[dict]:
+        """Return the last good weather data unless it is older than a day."""
+        with self._weather_lock:
+            cache = self._weather_cache
+        if not cache:
+            return None
+        fetched_at = cache.get("fetched_at")
+        if not fetched_at or (time.time() - fetched_at) >= WEATHER_MAX_AGE_SECONDS:
+            return None
+        return cache.get("data")
+
+    def _load_weather_cache(self) -> None:
+        try:
+            cache = json.loads(WEATHER_CACHE_PATH.read_text(encoding="utf-8"))
+            fetched_at = float(cache["fetched_at"])
+            data = cache["data"]
+        except (OSError, ValueError, TypeError, KeyError):
+            return
+        # A timestamp from the future means the clock was wrong when it was
+        # saved or is wrong now (a Pi without RTC boots before NTP sync).
+        age = time.time() - fetched_at
+        if not isinstance(data, dict) or age < 0 or age >= WEATHER_MAX_AGE_SECONDS:
+            return
+        with self._weather_lock:
+            self._weather_cache = {"data": data, "fetched_at": fetched_at}
+
+    def _save_weather_cache(self, cache: dict) -> None:
+        # write to a temp file and rename so a crash never leaves half a file
+        try:
+            WEATHER_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            tmp = WEATHER_CACHE_PATH.with_suffix(".tmp")
+            tmp.write_text(json.dumps(cache, ensure_ascii=False), encoding="utf-8")
+            tmp.replace(WEATHER_CACHE_PATH)
+        except OSError as exc:
+            print(f"Could not save weather cache: {exc}")
+
+    def _schedule_weather_refresh(self, delay: float) -> None:
+        timer = threading.Timer(delay, self._refresh_weather)
+        timer.daemon = True
+        with self._weather_lock:
+            self._weather_timer = timer
+        timer.start()
+
+    def _refresh_weather(self) -> None:
+        """Timer callback: fetch weather, store it and schedule the next run."""
+        self._weather_max_age = None
+        data = self.fetch_weather()
+        if data is not None:
+            cache = {"data": data, "fetched_at": time.time()}
+            with self._weather_lock:
+                self._weather_cache = cache
+            self._save_weather_cache(cache)
+            # force the display loop to redraw with fresh data
+            self._last_weather_minute = None
+        self._weather_attempted = True
+
+        if not self.running:
+            return
+        if data is None:
+            delay = WEATHER_RETRY_SECONDS
+        else:
+            ttl = self._weather_max_age
+            if ttl is None:
+                ttl = WEATHER_TTL_SECONDS
+            # max-age may shorten the refresh interval but never stretch it
+            # past our own TTL, or the data could expire before the next fetch.
+            delay = min(max(WEATHER_MIN_TTL_SECONDS, ttl), WEATHER_TTL_SECONDS)
+        delay += random.uniform(-WEATHER_JITTER_SECONDS, WEATHER_JITTER_SECONDS)
+        self._schedule_weather_refresh(max(WEATHER_MIN_TTL_SECONDS, delay))
+
+    def display_weather(self) -> None:
+        data = self._cached_weather()
+        if not data:
+            if self._weather_attempted:
+                show_static_message(self.driver, "Погода недоступна")
+            else:
+                show_static_message(self.driver, "Погода\nзагружается...")
+            return
+        # First line: time, date, weekday; only reformatted when the minute changes
+        minute = int(time.time() // 60)
+        cached_minute, first_line = self._clock_cache
+        if minute != cached_minute:
+            # struct_time already carries the weekday (tm_wday, Monday == 0)
+            now = time.localtime()
+            first_line = f"{time.strftime('%H:%M %d.%m', now)} {WEEKDAYS[now.tm_wday]}"
+            self._clock_cache = (minute, first_line)
+
+        # Second line: temp, humidity, wind (concise)
+        temp = data.get("temp")
+        humidity = data.get("humidity")
+        wind = data.get("wind")
+        # concise format: "T:XX° H:YY% W:Z.Z" to fit 20 chars
+        second_line = (
+            f"T:{'?' if temp is None else temp}° "
+            f"Вл:{'?' if humidity is None else humidity}% "
+            f"Вет:{'?' if wind is None else wind}"
+        )
+
+        # Show statically to avoid vertical scrolling; display driver will
+        # truncate/pad lines to DISPLAY_WIDTH.
+        show_static_message(self.driver, f"{first_line}\n{second_line}")
+
+    def _show_phrase(self, phrase: str) -> None:
+        """Show a catalogue phrase from its precomputed frames or bytes."""
+        if self.driver.writes_raw_bytes:
+            encoded = PRECOMPUTED_ENCODED.get(phrase)
+            if encoded is not None:
+                show_encoded_frames(self.driver, encoded)
+                return
+        frames = PRECOMPUTED_FRAMES.get(phrase)
+        if frames is not None:
+            show_frames(self.driver, frames)
+        else:
+            show_message(self.driver, phrase)
+
+    def _show_overlay(self) -> None:
+        while self.pending_overlay:
+            overlay = self.pending_overlay
+            self.pending_overlay = None
+            self._wake.clear()
+            self._display_busy = True
+            try:
+                show_static_message(self.driver, overlay)
+            finally:
+                self._display_busy = False
+            # Not busy while holding the overlay: another button press (mode
+            # button included) cuts it short and shows its own.
+            self._wake.wait(1.5)
+
+    def _simulate_loading(
+        self, duration: float = 5.0, interval: float = 0.7, ready_duration: float = 5.0
+    ) -> None:
+        """Fake loading sequence before the first phrase."""
+
+        start = time.monotonic()
+        frame = 0
+        while True:
+            remaining = duration - (time.monotonic() - start)
+            if remaining <= 0:
+                break
+
+            dots = "." * ((frame % 3) + 1)
+            show_static_message(self.driver, f"Маркошка v1.0\nзагружается{dots}")
+            frame += 1
+            time.sleep(min(interval, max(remaining, 0)))
+
+        show_static_message(self.driver, "Маркошка готова!\nПоехали!")
+        time.sleep(ready_duration)
+
+    def run(self) -> None:
+        self._simulate_loading()
+        next_tick = time.monotonic()
+        self.last_category_shown = None
+
+        while self.running:
+            self._show_overlay()
+
+            now = time.monotonic()
+            if now >= next_tick:
+                if self.mode == Mode.WEATHER:
+                    # Show weather only when minute changes, when first entering,
+                    # or when the background fetch delivered new data (it resets
+                    # the minute tracker). This prevents constant redrawing and
+                    # eliminates flicker.
+                    # epoch minute, same key as the clock-line cache
+                    curr_minute = int(time.time() // 60)
+                    if self._last_weather_minute is None or curr_minute != self._last_weather_minute:
+                        # record the minute first so a fetch finishing mid-draw
+                        # still triggers another redraw
+                        self._last_weather_minute = curr_minute
+                        # mark display busy while rendering weather to avoid button toggles
+                        self._display_busy = True
+                        try:
+                            self.display_weather()
+                        finally:
+                            self._display_busy = False
+
+                    self.last_category_shown = None
+                    next_tick = time.monotonic() + UPDATE_PERIOD_SECONDS
+                else:
+                    category, phrase = self.sequencer.next_phrase(self.mode)
+                    if self.mode != Mode.RANDOM:
+                        if category.name != self.last_category_shown:
+                            self._display_busy = True
+                            try:
+                                show_message(self.driver, category.name)
+                                time.sleep(5.0)
+                                self.last_category_shown = category.name
+                            finally:
+                                self._display_busy = False
+                    else:
+                        self.last_category_shown = None
+                    # show phrase (wraps/scrolls as necessary) while preventing mode toggles
+                    self._display_busy = True
+                    try:
+                        self._show_phrase(phrase)
+                    finally:
+                        self._display_busy = False
+                    next_tick = time.monotonic() + UPDATE_PERIOD_SECONDS
+
+            # Sleep until the next tick; button callbacks set the event so
+            # their overlay is shown without waiting for the tick.
+            self._wake.wait(max(0.0, next_tick - time.monotonic()))
+            self._wake.clear()
+
+    def stop(self) -> None:
+        # Called from the signal handler and again from main()'s finally;
+        # only the first call releases resources.
+        if self._stopped:
+            return
+        self._stopped = True
+        self.running = False
+        self._wake.set()
+        with self._weather_lock:
+            timer = self._weather_timer
+        if timer is not None:
+            timer.cancel()
+        # Close any ButtonManager instances if present.
+        for attr in ("mode_button", "weather_button"):
+            btn = getattr(self, attr, None)
+            if btn is not None:
+                try:
+                    btn.close()
+                except Exception:
+                    pass
+
+
+def main() -> None:
+    app = MarkoshkaApp()
+
+    def _signal_handler(_signo, _frame) -> None:
+        app.stop()
+
+    signal.signal(signal.SIGINT, _signal_handler)
+    signal.signal(signal.SIGTERM, _signal_handler)
+
+    try:
+        app.run()
+    finally:
+        app.stop()
+
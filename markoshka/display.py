@@ -2,23 +2,64 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from textwrap import wrap
-from time import sleep
-from typing import Iterable, List
+import codecs
+import os
+import sys
+from functools import lru_cache
+from time import monotonic, sleep
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
 
 
 DISPLAY_WIDTH = 20
 DISPLAY_HEIGHT = 2
 
+_CONSOLE_DIVIDER = "-" * (DISPLAY_WIDTH + 2)
+_BLANK_LINE = " " * DISPLAY_WIDTH
 
-@dataclass
-class DisplayFrame:
-    """Represents two lines of text ready for the LCD."""
+# A frame as lines (for ``write``) or as encoded bytes (for ``write_bytes``).
+_Frame = TypeVar("_Frame")
+
+# Character set of the PD2800; pre-encoded frames (see ``encode_frame``) are
+# DISPLAY_WIDTH * DISPLAY_HEIGHT bytes in this encoding.
+FRAME_ENCODING = "cp866"
+# Encoder resolved once; str.encode() would look the codec up by name on
+# every frame.
+_ENCODE_FRAME = codecs.getencoder(FRAME_ENCODING)
+
+
+class DisplayFrame(NamedTuple):
+    """Represents two lines of text ready for the LCD.
+
+    A NamedTuple rather than a dataclass: frames are created per scroll
+    step and need no per-instance ``__dict__``.
+    """
 
     lines: List[str]
 
 
+def _fit(line: str) -> str:
+    """Pad or cut ``line`` to exactly DISPLAY_WIDTH characters.
+
+    Cheaper than ``line.ljust(DISPLAY_WIDTH)[:DISPLAY_WIDTH]``: a long line
+    is only sliced and a short one only gets the missing blanks appended.
+    """
+
+    n = len(line)
+    if n >= DISPLAY_WIDTH:
+        return line[:DISPLAY_WIDTH]
+    return line + _BLANK_LINE[: DISPLAY_WIDTH - n]
+
+
 class DisplayDriver:
     """Basic interface for the LCD driver.
 
@@ -28,40 +69,130 @@ class DisplayDriver:
     strings.
     """
 
-    def write(self, lines: List[str]) -> None:
+    # Last frame sent to the device (lines tuple or encoded bytes); drivers
+    # skip writes that would redraw exactly the same content.
+    _last_frame: Optional[object] = None
+
+    # True when ``write_bytes`` sends encoded frames to the device as-is.
+    # Otherwise it only decodes back to text, and callers holding the text
+    # frames should use ``write`` instead.
+    writes_raw_bytes: bool = False
+
+    def write(self, lines: Sequence[str]) -> None:
         raise NotImplementedError
 
+    def write_bytes(self, frame: bytes) -> None:
+        """Write a frame pre-encoded with :py:func:`encode_frame`.
+
+        Drivers that talk ``FRAME_ENCODING`` to the hardware override this
+        to send the bytes as-is; the default decodes and calls ``write``.
+        """
+
+        text = frame.decode(FRAME_ENCODING)
+        self.write([text[i : i + DISPLAY_WIDTH] for i in range(0, len(text), DISPLAY_WIDTH)])
+
 
 class ConsoleDisplayDriver(DisplayDriver):
     """Fallback driver that prints frames to the console."""
 
-    def write(self, lines: List[str]) -> None:  # pragma: no cover - console output
-        divider = "-" * (DISPLAY_WIDTH + 2)
-        formatted_lines = [line.ljust(DISPLAY_WIDTH)[:DISPLAY_WIDTH] for line in lines]
-        print(divider)
-        for line in formatted_lines:
-            print(f"|{line}|")
-        print(divider)
+    def write(self, lines: Sequence[str]) -> None:  # pragma: no cover - console output
+        frame = tuple(lines)
+        if frame == self._last_frame:
+            return
+        line1 = _fit(frame[0]) if frame else _BLANK_LINE
+        line2 = _fit(frame[1]) if len(frame) > 1 else _BLANK_LINE
+        # The whole frame goes out in a single write, like on the hardware.
+        sys.stdout.write(
+            f"{_CONSOLE_DIVIDER}\n|{line1}|\n|{line2}|\n{_CONSOLE_DIVIDER}\n"
+        )
+        sys.stdout.flush()
+        self._last_frame = frame
+
 
+@lru_cache(maxsize=256)
+def _wrap_message_lines(message: str) -> Tuple[str, ...]:
+    """Normalize whitespace, honor explicit newlines, wrap without breaking words.
 
-def _wrap_message_lines(message: str) -> List[str]:
-    """Normalize whitespace, honor explicit newlines, wrap without breaking words."""
+    A plain greedy packer: words are added to the current row while they
+    fit. Like ``textwrap.wrap(..., break_long_words=False)``, a word longer
+    than the display gets a row of its own and is cut when framed.
+    Memoized, so the static, scrolling and ``show_message`` layouts of a
+    message share one wrap; the tuple result can't be mutated by callers.
+    """
 
     lines: List[str] = []
     for segment in message.split("\n"):
-        normalized = " ".join(segment.split())
-        if not normalized:
+        if (
+            len(segment) <= DISPLAY_WIDTH
+            and segment.isprintable()
+            and "  " not in segment
+            and not segment.startswith(" ")
+            and not segment.endswith(" ")
+        ):
+            # Already normalized and fits one row: the common case for
+            # catalogue phrases. isprintable() rules out tabs and any other
+            # whitespace that split() would collapse.
+            lines.append(segment)
+            continue
+        words = segment.split()
+        if not words:
             lines.append("")
             continue
-        wrapped = wrap(
-            normalized,
-            DISPLAY_WIDTH,
-            break_long_words=False,
-            break_on_hyphens=False,
-        )
-        lines.extend(wrapped)
+        current = words[0]
+        for word in words[1:]:
+            if len(current) + 1 + len(word) <= DISPLAY_WIDTH:
+                current = f"{current} {word}"
+            else:
+                lines.append(current)
+                current = word
+        lines.append(current)
 
-    return lines or [""]
+    return tuple(lines) or ("",)
+
+
+def _scrolling_frames_from_lines(lines: Sequence[str]) -> Tuple[Tuple[str, str], ...]:
+    """Padded line pairs for every scroll frame of already wrapped lines."""
+
+    # Each line is padded once; consecutive frames share the same string
+    # objects (this frame's bottom row is the next frame's top row).
+    padded = [_fit(line) for line in lines]
+    # Показываем сразу первые две строки, затем сдвигаем окно вверх.
+    return tuple((padded[idx], padded[idx + 1]) for idx in range(len(padded) - 1))
+
+
+def _static_frame_from_lines(lines: Sequence[str]) -> Tuple[str, str]:
+    """Padded line pair showing the first two of already wrapped lines."""
+
+    return _fit(lines[0]), _fit(lines[1]) if len(lines) > 1 else _BLANK_LINE
+
+
+# The caches below are keyed by message. Phrases come from a fixed
+# catalogue, so after the first display each one is served from the cache;
+# tuples keep the cached values immutable.
+
+
+@lru_cache(maxsize=1024)
+def _scrolling_lines(message: str) -> Tuple[Tuple[str, str], ...]:
+    return _scrolling_frames_from_lines(_wrap_message_lines(message))
+
+
+@lru_cache(maxsize=1024)
+def _static_lines(message: str) -> Tuple[str, str]:
+    return _static_frame_from_lines(_wrap_message_lines(message))
+
+
+@lru_cache(maxsize=1024)
+def message_frames(message: str) -> Tuple[Tuple[str, str], ...]:
+    """Frames :py:func:`show_message` plays, wrapping the message only once.
+
+    A message that fits yields its single static frame; a longer one yields
+    its scroll frames (always two or more).
+    """
+
+    lines = _wrap_message_lines(message)
+    if len(lines) <= DISPLAY_HEIGHT:
+        return (_static_frame_from_lines(lines),)
+    return _scrolling_frames_from_lines(lines)
 
 
 def vertical_scrolling_frames(message: str) -> Iterable[DisplayFrame]:
@@ -71,24 +202,35 @@ def vertical_scrolling_frames(message: str) -> Iterable[DisplayFrame]:
     строк шириной 20 символов так, чтобы они поднимались вверх.
     """
 
-    lines = _wrap_message_lines(message)
-
-    # Показываем сразу первые две строки, затем сдвигаем окно вверх.
-    for idx in range(len(lines) - 1):
-        first_line = lines[idx][:DISPLAY_WIDTH].ljust(DISPLAY_WIDTH)
-        second_line = lines[idx + 1][:DISPLAY_WIDTH].ljust(DISPLAY_WIDTH)
-        yield DisplayFrame([first_line, second_line])
+    for lines in _scrolling_lines(message):
+        yield DisplayFrame(list(lines))
 
 
 def static_frame(message: str) -> DisplayFrame:
     """Format a short message into two lines without scrolling."""
 
-    lines = _wrap_message_lines(message)
-    first_line = lines[0][:DISPLAY_WIDTH].ljust(DISPLAY_WIDTH)
-    second_line = (
-        lines[1][:DISPLAY_WIDTH].ljust(DISPLAY_WIDTH) if len(lines) > 1 else " " * DISPLAY_WIDTH
-    )
-    return DisplayFrame([first_line, second_line])
+    return DisplayFrame(list(_static_lines(message)))
+
+
+def _scroll_frames(
+    write: Callable[[_Frame], None], frames: Iterable[_Frame], delay: float
+) -> None:
+    """Write each frame and hold it for ``delay`` seconds.
+
+    Frames are paced against a fixed schedule, so the time spent in the
+    driver write counts towards the hold instead of adding to it. A frame
+    equal to the one before it (e.g. from blank lines in the message) is
+    not written again; the screen simply stays as it is.
+    """
+
+    prev: Optional[_Frame] = None
+    deadline = monotonic()
+    for frame in frames:
+        if frame != prev:
+            write(frame)
+            prev = frame
+        deadline += delay
+        sleep(max(0.0, deadline - monotonic()))
 
 
 def show_scrolling_message(
@@ -96,24 +238,72 @@ def show_scrolling_message(
 ) -> None:
     """Animate a **vertical** scrolling message using the given driver."""
 
-    for frame in vertical_scrolling_frames(message):
-        driver.write(frame.lines)
-        sleep(delay)
+    _scroll_frames(driver.write, _scrolling_lines(message), delay)
 
 
 def show_static_message(driver: DisplayDriver, message: str) -> None:
-    frame = static_frame(message)
-    driver.write(frame.lines)
+    driver.write(_static_lines(message))
+
+
+def encode_frame(lines: Sequence[str]) -> bytes:
+    """Encode a two-line frame into ``FRAME_ENCODING`` bytes.
+
+    Raises ``UnicodeEncodeError`` if the text has characters the display
+    cannot show, so callers can keep such messages on the text path.
+    """
+
+    text = "".join(
+        _fit(lines[row]) if row < len(lines) else _BLANK_LINE
+        for row in range(DISPLAY_HEIGHT)
+    )
+    return _ENCODE_FRAME(text)[0]
+
+
+def show_frames(
+    driver: DisplayDriver, frames: Sequence[Sequence[str]], delay: float = 3.0
+) -> None:
+    """Play frames from :py:func:`message_frames` (or precomputed ones).
+
+    A single frame is shown statically; several are scrolled with ``delay``
+    between them. No wrapping or padding happens here.
+    """
+
+    if len(frames) == 1:
+        driver.write(frames[0])
+        return
+    _scroll_frames(driver.write, frames, delay)
+
+
+def show_encoded_frames(
+    driver: DisplayDriver, frames: Sequence[bytes], delay: float = 3.0
+) -> None:
+    """Like :py:func:`show_frames` for frames from :py:func:`encode_frame`."""
+
+    if len(frames) == 1:
+        driver.write_bytes(frames[0])
+        return
+    _scroll_frames(driver.write_bytes, frames, delay)
 
 
 def show_message(driver: DisplayDriver, message: str, delay: float = 3.0) -> None:
     """Display a message statically if it fits, otherwise scroll it."""
 
-    lines = _wrap_message_lines(message)
-    if len(lines) <= DISPLAY_HEIGHT:
-        show_static_message(driver, message)
-    else:
-        show_scrolling_message(driver, message, delay=delay)
+    show_frames(driver, message_frames(message), delay=delay)
+
+
+def _changed_runs(old: str, new: str) -> Iterator[Tuple[int, int]]:
+    """Yield ``(start, end)`` column ranges where ``new`` differs from ``old``."""
+
+    start: Optional[int] = None
+    for col, (old_char, new_char) in enumerate(zip(old, new)):
+        if old_char != new_char:
+            if start is None:
+                start = col
+        elif start is not None:
+            yield start, col
+            start = None
+    if start is not None:
+        yield start, len(new)
 
 
 class PD2800I2CDisplayDriver(DisplayDriver):
@@ -151,21 +341,33 @@ class PD2800I2CDisplayDriver(DisplayDriver):
 
     def clear(self) -> None:
         self.lcd.clear()
-
-    def write(self, lines: List[str]) -> None:  # pragma: no cover - hardware dep
-        first_line = lines[0][:DISPLAY_WIDTH].ljust(DISPLAY_WIDTH)
-        second_line = (
-            lines[1][:DISPLAY_WIDTH].ljust(DISPLAY_WIDTH)
-            if len(lines) > 1
-            else " " * DISPLAY_WIDTH
+        self._last_frame = None
+        # What the LCD currently shows, row by row.
+        self._prev: List[str] = [_BLANK_LINE] * DISPLAY_HEIGHT
+
+    def write(self, lines: Sequence[str]) -> None:  # pragma: no cover - hardware dep
+        frame = tuple(lines)
+        if frame == self._last_frame:
+            return
+        rows = (
+            _fit(lines[0]) if lines else _BLANK_LINE,
+            _fit(lines[1]) if len(lines) > 1 else _BLANK_LINE,
         )
-        self.lcd.home()
-        self.lcd.write_string(first_line + "\n" + second_line)
+        # Every character is its own I2C transaction on the PCF8574, so only
+        # the cells that changed since the last frame are sent.
+        for row, (old, new) in enumerate(zip(self._prev, rows)):
+            for start, end in _changed_runs(old, new):
+                self.lcd.cursor_pos = (row, start)
+                self.lcd.write_string(new[start:end])
+        self._prev = list(rows)
+        self._last_frame = frame
 
 
 class PD2800SerialDisplayDriver(DisplayDriver):
     """PD2800 (20x2) через UART (VFD, ESC-команды, кодировка CP866)."""
 
+    writes_raw_bytes = True
+
     def __init__(
         self,
         port: str = "/dev/serial0",
@@ -179,9 +381,35 @@ class PD2800SerialDisplayDriver(DisplayDriver):
             raise RuntimeError("pyserial not installed. Install with `pip install pyserial`.") from exc
 
         self.serial = serial.Serial(port=port, baudrate=baudrate, timeout=timeout)
+        self._enable_low_latency(port)
         sleep(0.05)
         self._init_display(init_delay)
 
+    def _enable_low_latency(self, port: str) -> None:
+        """Ask USB serial adapters to send short frames right away.
+
+        FTDI-style adapters hold data for up to 16 ms waiting for the FIFO to
+        fill. Set ASYNC_LOW_LATENCY via pyserial (TIOCSSERIAL) and, failing
+        that, drop the sysfs ``latency_timer`` to 1 ms. Ports that support
+        neither (e.g. the Pi's own /dev/serial0 UART) are left untouched.
+        """
+
+        set_low_latency = getattr(self.serial, "set_low_latency_mode", None)
+        if set_low_latency is not None:
+            try:
+                set_low_latency(True)
+                return
+            except Exception:
+                pass
+
+        device = os.path.basename(os.path.realpath(port))
+        latency_timer = f"/sys/bus/usb-serial/devices/{device}/latency_timer"
+        try:
+            with open(latency_timer, "w") as fh:
+                fh.write("1")
+        except OSError:
+            pass
+
     def _init_display(self, init_delay: float) -> None:
         self.serial.write(b"\x1b@")  # init
         sleep(init_delay)
@@ -189,25 +417,34 @@ class PD2800SerialDisplayDriver(DisplayDriver):
     def clear(self) -> None:
         self.serial.write(b"\x0c")  # clear
         sleep(0.05)
-
-    def _write_line(self, cmd: bytes, text: str) -> None:
-        # Some PD2800 UART firmwares expect an extra leading control/address
-        # byte before printable characters. Prefix a NUL byte and then send
-        # the full DISPLAY_WIDTH characters so the device doesn't shift one
-        # character between lines.
-        payload = ("\x00" + text.ljust(DISPLAY_WIDTH)[: DISPLAY_WIDTH]).encode(
-            "cp866", errors="replace"
+        self._last_frame = None
+
+    # ESC Q / ESC R move to the start of line 1 / line 2. Some PD2800 UART
+    # firmwares expect an extra leading control/address byte before
+    # printable characters, so a NUL follows and then the full
+    # DISPLAY_WIDTH characters, so the device doesn't shift one character
+    # between lines. Since every line is rewritten in full, no clear is
+    # needed between frames.
+    _LINE1_PREFIX = b"\x1bQ\x00"
+    _LINE2_PREFIX = b"\x1bR\x00"
+
+    def write(self, lines: Sequence[str]) -> None:  # pragma: no cover - hardware dep
+        line1 = _fit(lines[0]) if lines else _BLANK_LINE
+        line2 = _fit(lines[1]) if len(lines) > 1 else _BLANK_LINE
+        self.write_bytes(_ENCODE_FRAME(line1 + line2, "replace")[0])
+
+    def write_bytes(self, frame: bytes) -> None:  # pragma: no cover - hardware dep
+        if frame == self._last_frame:
+            return
+        # One buffer per frame: a single UART write and flush.
+        self.serial.write(
+            self._LINE1_PREFIX
+            + frame[:DISPLAY_WIDTH]
+            + self._LINE2_PREFIX
+            + frame[DISPLAY_WIDTH : 2 * DISPLAY_WIDTH]
         )
-        self.serial.write(cmd)
-        self.serial.write(payload)
-
-    def write(self, lines: List[str]) -> None:  # pragma: no cover - hardware dep
-        line1 = lines[0] if lines else ""
-        line2 = lines[1] if len(lines) > 1 else ""
-        self.clear()
-        self._write_line(b"\x1bQ", line1)
-        self._write_line(b"\x1bR", line2)
         self.serial.flush()
+        self._last_frame = frame
 
 
 # Backward compatibility alias
@@ -3,7 +3,9 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List
+from typing import Dict, Tuple
+
+from markoshka.display import encode_frame, message_frames
 
 
 @dataclass(frozen=True)
@@ -11,13 +13,13 @@ class Category:
     """Represents a category of phrases."""
 
     name: str
-    phrases: List[str]
+    phrases: Tuple[str, ...]
 
 
 PHRASE_CATALOGUE: Dict[str, Category] = {
     "tired_mom": Category(
         name="Категория 1: Для\nуставшей мамы",
-        phrases=[
+        phrases=(
             "Марго, ты -\nсупермама!",
             "Робушка спит?\nТы - герой.",
             "Маргоша, дыши.\nТы справишься.",
@@ -75,11 +77,11 @@ PHRASE_CATALOGUE: Dict[str, Category] = {
             "Ты не одна.\nТы любима всегда.",
             "Твои старания\nвидны сердцу.",
             "Марго, ты творишь\nчудо каждый день.",
-        ],
+        ),
     ),
     "sarcasm": Category(
         name="Категория 2: Сарказм и юмор мамы",
-        phrases=[
+        phrases=(
             "Робушка поел.\nМама забыла поесть.",
             "Идеальный порядок?\nВ другой жизни.",
             "Снова суп в волосах.\nЭто новый тренд.",
@@ -119,11 +121,11 @@ PHRASE_CATALOGUE: Dict[str, Category] = {
             "Сон для слабаков.\nА я — мама.",
             "Кто я? Где я?\nЧей это памперс?",
             "Моя суперсила —\nжить без сна.",
-        ],
+        ),
     ),
     "diabetic": Category(
         name="Категория 3:\nДля диабетика",
-        phrases=[
+        phrases=(
             "Ты справляешься.\nКаждый день.",
             "Не идеально —\nдостаточно.",
             "Сахар — цифра.\nТы — больше.",
@@ -150,11 +152,11 @@ PHRASE_CATALOGUE: Dict[str, Category] = {
             "Диабет хотел стресса.\nНе сегодня.",
             "Темно сейчас.\nЭто пройдет.",
             "Марго, ты сильнее,\nчем кажется.",
-        ],
+        ),
     ),
     "vegan": Category(
         name="Категория 4:\nДля веганки",
-        phrases=[
+        phrases=(
             "Спасать мир? Начать с тарелки.",
             "Любовь ко всем существам - сила.",
             "Ритуля, твоя этика вдохновляет.",
@@ -188,11 +190,11 @@ PHRASE_CATALOGUE: Dict[str, Category] = {
             "Ты вдохновляешь\nбыть лучше.",
             "Сострадание — твое\nвторое имя.",
             "Ты выбираешь жизнь\nкаждый день.",
-        ],
+        ),
     ),
     "statham": Category(
         name="Категория 5:\nДжейсон Стэтхэм",
-        phrases=[
+        phrases=(
             "Проблема? Назови ее. Устраним.",
             "Устал? Отдохни 5 сек. Поехали дальше.",
             "Планы Роберта сорваны. Мои - нет.",
@@ -223,11 +225,11 @@ PHRASE_CATALOGUE: Dict[str, Category] = {
             "Жизнь — бой.\nНо ты — боец.",
             "Характер — это то,\nчто делаешь в хаосе.",
             "Ты идешь вперед.\nЭтого достаточно.",
-        ],
+        ),
     ),
     "motivation": Category(
         name="Категория 6:\nОбщие мотивирующие",
-        phrases=[
+        phrases=(
             "Все будет. Но не сразу.",
             "Запуталась? Значит, ищешь путь.",
             "Не бойся начинать с нуля.",
@@ -273,11 +275,11 @@ PHRASE_CATALOGUE: Dict[str, Category] = {
             "Твоя сила в том,\nчто не сдаешься.",
             "Отпусти ожидания.\nОставь движение.",
             "Ты растешь даже\nв медленные дни.",
-        ],
+        ),
     ),
     "absurd": Category(
         name="Категория 7: Смешные и абсурдные",
-        phrases=[
+        phrases=(
             "Если все плохо, поешь печенье.",
             "Кризис? Добавь авокадо.",
             "Мысли разбежались. Ловить лень.",
@@ -313,11 +315,11 @@ PHRASE_CATALOGUE: Dict[str, Category] = {
             "Планирую быть\nнепланируемой.",
             "Лучшее решение —\nне принимать решений.",
             "Мой мозг перегрелся.\nПерезапуск.",
-        ],
+        ),
     ),
     "movies": Category(
         name="Категория 8: Из фильмов (сериалов)",
-        phrases=[
+        phrases=(
             "После стольких лет?\nВсегда.",
             "Счастье можно найти\nдаже в темные времена.",
             "Не стоит забивать голову\nерундой.",
@@ -425,11 +427,11 @@ PHRASE_CATALOGUE: Dict[str, Category] = {
             "Выбери путь.\nИди по нему.",
             "В хаосе — сила.\nВ тишине — ответы.",
             "Герои тоже\nиногда плачут.",
-        ],
+        ),
     ),
     "travel": Category(
         name="Категория 9: Путешествия и мечты",
-        phrases=[
+        phrases=(
             "Мальдивы, 2021.\n5 лет свадьбы.",
             "Мальдивы. Часть 2.\nСъемки в 2026.",
             "Италия: Пиза, Флоренция, Рим 2019.",
@@ -496,6 +498,41 @@ PHRASE_CATALOGUE: Dict[str, Category] = {
             "Хочешь перемен?\nОткрой карту.",
             "Отдых — это\nинвестиция в душу.",
             "Мир огромен.\nИ он твой.",
-        ],
+        ),
     ),
 }
+
+
+def precompute_frames(
+    catalogue: Dict[str, Category] = PHRASE_CATALOGUE,
+) -> Dict[str, Tuple[Tuple[str, str], ...]]:
+    """Wrap and pad every phrase once, ready for ``display.show_frames``."""
+
+    return {
+        phrase: message_frames(phrase)
+        for category in catalogue.values()
+        for phrase in category.phrases
+    }
+
+
+def precompile_phrases(
+    frames: Dict[str, Tuple[Tuple[str, str], ...]],
+) -> Dict[str, Tuple[bytes, ...]]:
+    """Pre-encode every phrase's frames into display-ready bytes.
+
+    The serial driver sends these as-is, so showing a phrase costs no
+    padding or encoding. Phrases with characters outside the display
+    encoding are left out and go through the regular text path.
+    """
+
+    encoded: Dict[str, Tuple[bytes, ...]] = {}
+    for phrase, phrase_frames in frames.items():
+        try:
+            encoded[phrase] = tuple(encode_frame(frame) for frame in phrase_frames)
+        except UnicodeEncodeError:
+            continue
+    return encoded
+
+
+PRECOMPUTED_FRAMES: Dict[str, Tuple[Tuple[str, str], ...]] = precompute_frames()
+PRECOMPUTED_ENCODED: Dict[str, Tuple[bytes, ...]] = precompile_phrases(PRECOMPUTED_FRAMES)